@@ -2,6 +2,7 @@ import importlib
 import inspect
 import os
 import sys
+from functools import lru_cache
 from pathlib import Path
 
 from loguru import logger
@@ -37,12 +38,15 @@ logger.add(
 )
 
 
+@lru_cache(maxsize=1)
 def collect_public_flows() -> dict[str, Flow]:
     """This functions serves two purposes.
     1. Gathers all the flows in any submodule present in the "PUBLIC_FLOWS" dictionary
     2. Does the above without importing upon the 'flows' module init but on demand.
     This is to avoid importing Ray unecessarily or before patching at test time
 
+    The discovery is memoized, so the modules are only walked and imported once.
+
     Returns:
         dict[str, Flow]: Mapping from 'flow name' to Flow for every public Flow found
     """
@@ -1,14 +1,11 @@
-import base64
-import json
 import os
 from pathlib import Path
 
 import click
-import cloudpickle
-from tabulate import tabulate
+import orjson
 
-from flows import collect_public_flows
-from flows.deploy import deploy_flow, PoolType
+from flows.constants import PoolType
+from flows.helpers import dumps_json
 
 # Default storage path for Prefect
 DEFAULT_PREFECT_STORAGE_PATH = Path.home() / ".prefect" / "storage"
@@ -22,18 +19,26 @@ def cli():
 @cli.command("ls")
 def list_flows():
     """List all publicly available flows"""
-    repo_root = Path.cwd()
-    rows = []
+    from tabulate import tabulate
+
+    from flows import collect_public_flows
+
+    # Flows outside the repo (e.g.: site-packages installs) keep their absolute path
+    repo_root = str(Path.cwd()) + os.sep
+
     headers = ["Flow Name", "From", "Flow Parameters"]
-    for flow_name, flow in collect_public_flows().items():
-        code_file_path = Path(flow.fn.__code__.co_filename)
-        flow_path = code_file_path.relative_to(repo_root)
-        flow_params = {
-            p: p_info.get("description", "N/D")
-            for p, p_info in flow.parameters.properties.items()
-        }
-        params_str = "- " + "\n- ".join(f"{p}: {d}" for p, d in flow_params.items())
-        rows.append((flow_name, flow_path, params_str))
+    # NOTE: 'parameters.properties' is a plain dict of JSON schemas per parameter
+    rows = (
+        (
+            flow_name,
+            flow.fn.__code__.co_filename.removeprefix(repo_root),
+            "\n".join(
+                f"- {p}: {p_info.get('description', 'N/D')}"
+                for p, p_info in flow.parameters.properties.items()
+            ),
+        )
+        for flow_name, flow in collect_public_flows().items()
+    )
     print(
         tabulate(
             rows,
@@ -45,7 +50,7 @@ def list_flows():
 
 
 @cli.command("deploy")
-@click.argument("flow_name", type=click.Choice(list(collect_public_flows().keys())))
+@click.argument("flow_name")
 @click.argument("deployment_name")
 @click.argument("pool-type", type=click.Choice([p.value for p in PoolType]))
 @click.argument("work-pool-name")
@@ -72,6 +77,17 @@ def deploy_flow_cli(
         build (bool, optional): Wether to build docker image. Defaults to False.
         flow_tags (list[str] | None, optional): List of Prefect tags. Defaults to ['LINT'].
     """
+    from flows import collect_public_flows
+    from flows.deploy import deploy_flow
+
+    # NOTE: Validated here rather than with a click.Choice so that flow discovery
+    # is only paid by the commands that need it
+    if flow_name not in (public_flows := collect_public_flows()):
+        raise click.BadParameter(
+            f"{flow_name!r} is not one of {', '.join(map(repr, public_flows))}.",
+            param_hint="'FLOW_NAME'",
+        )
+
     deploy_flow(flow_name, deployment_name, pool_type, work_pool_name, build, flow_tags)
 
 
@@ -80,32 +96,60 @@ def deploy_flow_cli(
 @click.option(
     "-s",
     "--storage-path",
+    type=click.Path(file_okay=False, path_type=Path),
     default=os.getenv("PREFECT_LOCAL_STORAGE_PATH", DEFAULT_PREFECT_STORAGE_PATH),
 )
-def read_from_storage(result_id: str, storage_path: str):
-    rfile = Path(storage_path).resolve() / result_id
+def read_from_storage(result_id: str, storage_path: Path):
+    rfile = storage_path.resolve() / result_id
     if rfile.exists():
-        res = json.load(rfile.open())
-        result = cloudpickle.loads(base64.b64decode(res["data"]))
-        print(json.dumps(result, indent=2))
+        import base64
+        import pickle
+
+        res = orjson.loads(rfile.read_bytes())
+        data = base64.b64decode(res["data"])
+        # NOTE: cloudpickle only customizes pickling; its 'loads' is 'pickle.loads'
+        result = pickle.loads(data)
+        print(dumps_json(result).decode())
     else:
         print(f"💥 {rfile} could not be found!")
 
 
-@click.group("chroma")
-def chroma_cli():
-    """ChromaDB CLI"""
-    pass
+@click.group("chroma", chain=True)
+@click.option("--host", default=os.getenv("CHROMA_HOST", "localhost"))
+@click.option("--port", type=int, default=os.getenv("CHROMA_PORT", 8000))
+@click.pass_context
+def chroma_cli(ctx: click.Context, host: str, port: int):
+    """ChromaDB CLI
 
+    Subcommands can be chained to run over a single connection.
+    e.g.: python -m flows chroma --port 8000 ls lsc <collection-name>
 
-@chroma_cli.command("ls")
-@click.option("--host", default=os.getenv("CHROMA_HOST", "localhost"))
-@click.option("--port", default=os.getenv("CHROMA_PORT", 8000))
-def list_collections(host: str, port: int):
-    """List all collections in the ChromaDB"""
+    Subcommands' own --host/--port take precedence over the group's.
+    """
+    # NOTE: chromadb's HttpClient has no public close(); its HTTP session is
+    # released when the process exits
+    ctx.obj = {"host": host, "port": port, "clients": {}}
+
+
+def get_chroma_client(ctx: click.Context, host: str | None, port: int | None):
+    """Returns the ChromaClient for host:port (defaulting to the group's), shared by
+    all the chained 'chroma' subcommands and connecting on first use"""
     from flows.common.clients.chroma import ChromaClient
 
-    client = ChromaClient(host, port)
+    key = (host or ctx.obj["host"], port or ctx.obj["port"])
+    if key not in ctx.obj["clients"]:
+        ctx.obj["clients"][key] = ChromaClient(*key)
+
+    return ctx.obj["clients"][key]
+
+
+@chroma_cli.command("ls")
+@click.option("--host", default=None, help="Defaults to the 'chroma' group's host")
+@click.option("--port", type=int, default=None, help="Defaults to the group's port")
+@click.pass_context
+def list_collections(ctx: click.Context, host: str | None, port: int | None):
+    """List all collections in the ChromaDB"""
+    client = get_chroma_client(ctx, host, port)
     print("================ Collections ================")
     for collection in client.db.list_collections():
         print(f"- {collection}")
@@ -116,15 +160,18 @@ def list_collections(host: str, port: int):
 @chroma_cli.command("lsc")
 @click.argument("collection_name")
 @click.option("-m", "--metadata-fields", default=["doc_id"], multiple=True)
-@click.option("--host", default=os.getenv("CHROMA_HOST", "localhost"))
-@click.option("--port", default=os.getenv("CHROMA_PORT", 8000))
+@click.option("--host", default=None, help="Defaults to the 'chroma' group's host")
+@click.option("--port", type=int, default=None, help="Defaults to the group's port")
+@click.pass_context
 def list_collection(
-    collection_name: str, metadata_fields: list[str], host: str, port: int
+    ctx: click.Context,
+    collection_name: str,
+    metadata_fields: list[str],
+    host: str | None,
+    port: int | None,
 ):
     """List a ChromaDB's collection contents"""
-    from flows.common.clients.chroma import ChromaClient
-
-    client = ChromaClient(host, port)
+    client = get_chroma_client(ctx, host, port)
     print(f"================ Collection {collection_name} ================")
     client.print_collection_contents(
         collection_name=collection_name, metadata_fields=metadata_fields
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class PoolType(str, Enum):
+    DOCKER = "docker"
+    PROCESS = "process"
@@ -1,18 +1,12 @@
-from enum import Enum
 from pathlib import Path
 
 from prefect import Flow
 
 from flows import collect_public_flows
+from flows.constants import PoolType
 from flows.shrag.constants import OPENAI_API_KEY_ENV_VAR
 from flows.shrag.helpers import get_or_raise, get_project_version
 
-
-class PoolType(str, Enum):
-    DOCKER = "docker"
-    PROCESS = "process"
-
-
 # Environment variables shared with Prefect. Different flows will have different needs
 # aws_key, aws_secret = get_aws_credentials()
 
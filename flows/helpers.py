@@ -0,0 +1,27 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+
+def dumps_json(obj: Any) -> bytes:
+    """Serializes 'obj' as indented JSON with orjson. Falls back to the stdlib json
+    for what orjson rejects (e.g.: integers beyond 64 bits)"""
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return json.dumps(obj, indent=2).encode()
+
+
+def write_json(path: Path, obj: Any, fsync: bool = False):
+    """Writes 'obj' as indented JSON into 'path'. The object is serialized before
+    opening the file, so a serialization error doesn't leave a truncated file behind.
+    If 'fsync' is set, the file is flushed to disk before returning"""
+    data = dumps_json(obj)
+    with path.open("wb") as f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
@@ -22,9 +22,49 @@ from flows.shrag.constants import (
 )
 
 
+def _init_questioner(
+    chroma_collection_name: str,
+    chroma_host: str,
+    chroma_port: int,
+    llm_backend: str,
+    llm_model: str,
+    embedding_model: str,
+    reranker_model: str | None,
+    chroma_client: Any = None,
+):
+    """Loads the LLM, embedding model and ChromaDB index and builds a QAgent on top.
+    A new ChromaClient is only created if no 'chroma_client' is given"""
+    from flows.common.clients.chroma import ChromaClient
+    from flows.common.clients.llms import get_embedding_model, get_llm
+    from flows.shrag.qa import QAgent
+
+    # Get the LLM and embedding model
+    llm = get_llm(
+        llm_backend=llm_backend,
+        llm_model=llm_model,
+    )
+    embed_model = get_embedding_model(
+        llm_backend=llm_backend, embedding_model=embedding_model
+    )
+    Settings.llm = llm
+    Settings.embed_model = embed_model
+
+    # Get the ChromaDB index
+    if chroma_client is None:
+        chroma_client = ChromaClient(chroma_host, chroma_port)
+    index = chroma_client.get_index(embed_model, chroma_collection_name)
+    logger.info("🔍 Index loaded successfully!")
+
+    return QAgent(
+        index=index,
+        llm=llm,
+        reranker=reranker_model,
+    )
+
+
 @flow(log_prints=True, flow_run_name="playbook-QA-{chroma_collection_name}-{llm_model}")
 def playbook_qa(
-    playbook_json: Path | str,
+    playbook_json: Path | str | dict,
     meta_filters: dict[str, Any],
     chroma_collection_name: str,
     chroma_host: str = os.getenv(CHROMA_HOST_ENV_VAR, CHROMA_HOST_DEFAULT),
@@ -35,6 +75,8 @@ def playbook_qa(
     reranker_model: str | None = None,
     similarity_top_k: int = SIMILARITY_TOP_K_DEFAULT,
     similarity_cutoff: float = SIMILARITY_CUTOFF_DEFAULT,
+    pbar: bool = True,
+    chroma_client: Any = None,
 ):
     """This flow is responsible for performing Structured QA on a set of
     textual chunks retrieved from a vector DB based on metadata filtering.
@@ -42,7 +84,8 @@ def playbook_qa(
     in the given chromaDB collection.
 
     Args:
-        playbook_json (Path | str): Path to the playbook JSON file
+        playbook_json (Path | str | dict): Path to the playbook JSON file or its
+            already parsed contents
         meta_filters (dict[str, Any], optional): Metadata filters for retrieval
             as {key:value} mapping. Leave as an empty dict for no filtering.
         chroma_collection_name (str): Name of the ChromaDB collection
@@ -62,55 +105,130 @@ def playbook_qa(
             Defaults to SIMILARITY_TOP_K_DEFAULT.
         similarity_cutoff (float, optional): Similarity cutoff for retrieval.
             Defaults to SIMILARITY_CUTOFF_DEFAULT.
+        pbar (bool, optional): Whether to show a progress bar. Only one can be
+            displayed at a time, so disable it for concurrent runs. Defaults to True.
+        chroma_client (ChromaClient, optional): Already connected ChromaClient to
+            reuse across runs. When given, chroma_host and chroma_port are ignored.
+            Defaults to None.
     Returns:
         responses (list[QAResponse]): List of QAResponse objects containing the question, question type and answer
         for each question in the question library.
     """
-    from flows.common.clients.chroma import ChromaClient
-    from flows.common.clients.llms import get_embedding_model, get_llm
     from flows.shrag.playbook import build_question_library
-    from flows.shrag.qa import QAgent
 
     # Build the Question Library
     q_collection = build_question_library(playbook_json)
 
-    # Get the LLM and embedding model
-    llm = get_llm(
+    # Init the QAgent
+    questioner = _init_questioner(
+        chroma_collection_name=chroma_collection_name,
+        chroma_host=chroma_host,
+        chroma_port=chroma_port,
         llm_backend=llm_backend,
         llm_model=llm_model,
+        embedding_model=embedding_model,
+        reranker_model=reranker_model,
+        chroma_client=chroma_client,
     )
-    embed_model = get_embedding_model(
-        llm_backend=llm_backend, embedding_model=embedding_model
-    )
-    Settings.llm = llm
-    Settings.embed_model = embed_model
 
-    # Get the ChromaDB index
-    index = ChromaClient(chroma_host, chroma_port).get_index(
-        embed_model, chroma_collection_name
+    # Run the Q-collection and return the responses
+    responses = questioner.run_q_collection(
+        q_collection=q_collection,
+        meta_filters=meta_filters,
+        similarity_top_k=similarity_top_k,
+        similarity_cutoff=similarity_cutoff,
+        pbar=pbar,
     )
-    logger.info("🔍 Index loaded successfully!")
+
+    # FIXME: Not all QA responses are serializable
+    return {k: v.model_dump() for k, v in responses.items()}
+
+
+@flow(
+    log_prints=True,
+    flow_run_name="playbook-QA-batched-{chroma_collection_name}-{llm_model}",
+)
+def playbook_qa_batched(
+    playbook_json: Path | str | dict,
+    names: list[str],
+    chroma_collection_name: str,
+    chroma_host: str = os.getenv(CHROMA_HOST_ENV_VAR, CHROMA_HOST_DEFAULT),
+    chroma_port: int = os.getenv(CHROMA_PORT_ENV_VAR, CHROMA_PORT_DEFAULT),
+    llm_backend: str = os.getenv(LLM_BACKEND_ENV_VAR, LLM_BACKEND_DEFAULT),
+    llm_model: str = os.getenv(LLM_MODEL_ENV_VAR, LLM_MODEL_DEFAULT),
+    embedding_model: str = os.getenv(EMBEDDING_MODEL_ENV_VAR, EMBEDDING_MODEL_DEFAULT),
+    reranker_model: str | None = None,
+    similarity_top_k: int = SIMILARITY_TOP_K_DEFAULT,
+    similarity_cutoff: float = SIMILARITY_CUTOFF_DEFAULT,
+    chroma_client: Any = None,
+):
+    """Batched version of 'playbook_qa'. Instead of one retrieval per document and
+    question, each question is retrieved once for all the given document names
+    (i.e.: metadata filter '{name: {$in: names}}') and the retrieved chunks are then
+    dispatched to a per-document generation step.
+
+    Args:
+        playbook_json (Path | str | dict): Path to the playbook JSON file or its
+            already parsed contents
+        names (list[str]): Document names (metadata 'name' values) to run on
+        chroma_collection_name (str): Name of the ChromaDB collection
+        chroma_host (str, optional): ChromaDB host.
+            Defaults to CHROMA_HOST_DEFAULT.
+        chroma_port (int, optional): ChromaDB port.
+            Defaults to CHROMA_PORT_DEFAULT.
+        llm_backend (str, optional): LLM backend to use.
+            Defaults to LLM_BACKEND_DEFAULT.
+        llm_model (str, optional): LLM model to use.
+            Defaults to LLM_MODEL_DEFAULT.
+        embedding_model (str, optional): Embedding model to use.
+            Defaults to EMBEDDING_MODEL_DEFAULT.
+        reranker_model (str | None, optional): Reranker model to use.
+            Defaults to None.
+        similarity_top_k (int, optional): Number of top results to retrieve per
+            document. Defaults to SIMILARITY_TOP_K_DEFAULT.
+        similarity_cutoff (float, optional): Similarity cutoff for retrieval.
+            Defaults to SIMILARITY_CUTOFF_DEFAULT.
+        chroma_client (ChromaClient, optional): Already connected ChromaClient to
+            reuse across runs. When given, chroma_host and chroma_port are ignored.
+            Defaults to None.
+    Returns:
+        responses (dict[str, dict]): Mapping from document name to its responses
+        (as returned by 'playbook_qa')
+    """
+    from flows.shrag.playbook import build_question_library
+
+    # Build the Question Library
+    q_collection = build_question_library(playbook_json)
 
     # Init the QAgent
-    questioner = QAgent(
-        index=index,
-        llm=llm,
-        reranker=reranker_model,
+    questioner = _init_questioner(
+        chroma_collection_name=chroma_collection_name,
+        chroma_host=chroma_host,
+        chroma_port=chroma_port,
+        llm_backend=llm_backend,
+        llm_model=llm_model,
+        embedding_model=embedding_model,
+        reranker_model=reranker_model,
+        chroma_client=chroma_client,
     )
 
-    # Run the Q-collection and return the responses
-    responses = questioner.run_q_collection(
+    # Run the Q-collection for the whole batch of documents
+    responses = questioner.run_q_collection_batch(
         q_collection=q_collection,
-        meta_filters=meta_filters,
+        batch_key="name",
+        batch_values=names,
         similarity_top_k=similarity_top_k,
         similarity_cutoff=similarity_cutoff,
         pbar=True,
     )
 
-    # FIXME: Not all QA responses are serializable
-    return {k: v.model_dump() for k, v in responses.items()}
+    return {
+        name: {k: v.model_dump() for k, v in res.items()}
+        for name, res in responses.items()
+    }
 
 
 PUBLIC_FLOWS: dict[str, Flow] = {
     playbook_qa.name: playbook_qa,
+    playbook_qa_batched.name: playbook_qa_batched,
 }
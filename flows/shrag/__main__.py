@@ -1,11 +1,12 @@
-import json
+import asyncio
 import os
-from functools import wraps
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 import click
 
-from flows.shrag import playbook_qa
+from flows.helpers import write_json
+from flows.shrag import playbook_qa, playbook_qa_batched
 from flows.shrag.constants import (
     CHROMA_HOST_DEFAULT,
     CHROMA_PORT_DEFAULT,
@@ -15,33 +16,60 @@ from flows.shrag.constants import (
     LLM_BACKEND_ENV_VAR,
     LLM_MODEL_DEFAULT,
     LLM_MODEL_ENV_VAR,
+    QA_BATCH_SIZE_DEFAULT,
     SIMILARITY_CUTOFF_DEFAULT,
     SIMILARITY_TOP_K_DEFAULT,
 )
+from flows.shrag.helpers import iter_files
 
 
-def common_rag_options(func):
-    @click.argument("chroma_collection_name")
-    @click.option("--chroma-host", default=CHROMA_HOST_DEFAULT)
-    @click.option("--chroma-port", type=int, default=CHROMA_PORT_DEFAULT)
-    @click.option(
+def _parse_meta_filters(pairs: tuple[str, ...]) -> dict[str, str]:
+    """Parses 'key:value' pairs into a dictionary. Only the first ':' separates the
+    key from the value, so values can contain ':' (e.g.: 'url:http://...')"""
+    out = {}
+    for p in pairs:
+        k, sep, v = p.partition(":")
+        if not sep:
+            raise click.BadParameter(
+                f"{p!r} is not a 'key:value' pair.",
+                param_hint="'-m' / '--meta_filters'",
+            )
+        out[k] = v
+    return out
+
+
+def _result_filename(meta_filters: dict[str, str]) -> str:
+    """Name of the QA results file; concatenates the filters to the file name"""
+    filters = "_".join(f"{k}={v}" for k, v in meta_filters.items())
+    return f"{filters}_qa_results.json"
+
+
+# Built once at import time and shared by every command using them
+_COMMON_RAG_OPTIONS = (
+    click.argument("chroma_collection_name"),
+    click.option("--chroma-host", default=CHROMA_HOST_DEFAULT),
+    click.option("--chroma-port", type=int, default=CHROMA_PORT_DEFAULT),
+    click.option(
         "--llm-backend", default=os.getenv(LLM_BACKEND_ENV_VAR, LLM_BACKEND_DEFAULT)
-    )
-    @click.option(
+    ),
+    click.option(
         "--llm-model", default=os.getenv(LLM_MODEL_ENV_VAR, LLM_MODEL_DEFAULT)
-    )
-    @click.option(
+    ),
+    click.option(
         "--embedding-model",
         default=os.getenv(EMBEDDING_MODEL_ENV_VAR, EMBEDDING_MODEL_DEFAULT),
-    )
-    @click.option("--reranker-model", default=None)
-    @click.option("--similarity-top-k", type=int, default=SIMILARITY_TOP_K_DEFAULT)
-    @click.option("--similarity-cutoff", type=float, default=SIMILARITY_CUTOFF_DEFAULT)
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        return func(*args, **kwargs)
+    ),
+    click.option("--reranker-model", default=None),
+    click.option("--similarity-top-k", type=int, default=SIMILARITY_TOP_K_DEFAULT),
+    click.option("--similarity-cutoff", type=float, default=SIMILARITY_CUTOFF_DEFAULT),
+)
 
-    return wrapper
+
+def common_rag_options(func):
+    # Applied bottom-up, as if stacked as decorators in the order above
+    for option in reversed(_COMMON_RAG_OPTIONS):
+        func = option(func)
+    return func
 
 
 @click.group()
@@ -50,15 +78,26 @@ def cli():
 
 
 @cli.command()
-@click.argument("input-directory")
-@click.argument("output-directory")
-@click.argument("playbook_json")
+@click.argument(
+    "input-directory", type=click.Path(exists=True, file_okay=False, path_type=Path)
+)
+@click.argument("output-directory", type=click.Path(file_okay=False, path_type=Path))
+@click.argument(
+    "playbook_json", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
 @common_rag_options
 @click.option("-fg", "--file-glob", default="*.canonical.pdf", help="File glob pattern")
+@click.option(
+    "-c",
+    "--max-concurrency",
+    type=click.IntRange(min=1),
+    default=8,
+    help="Maximum number of documents processed concurrently",
+)
 def run_playbook_qa_from_directory(
-    input_directory: str,
-    output_directory: str,
-    playbook_json: str,
+    input_directory: Path,
+    output_directory: Path,
+    playbook_json: Path,
     chroma_collection_name: str,
     chroma_host: str,
     chroma_port: int,
@@ -69,6 +108,7 @@ def run_playbook_qa_from_directory(
     similarity_top_k: int,
     similarity_cutoff: float,
     file_glob: str,
+    max_concurrency: int,
 ):
     """Runs the RAG dataflow on all document files in the specified directory
     using the document names as metafilters.
@@ -85,17 +125,29 @@ def run_playbook_qa_from_directory(
         similarity_top_k (int, optional): Number of top results to retrieve. Defaults to 5.
         similarity_cutoff (float, optional): Similarity cutoff for retrieval. Defaults to 0.3.
         file_glob (str, optional): File glob pattern. Defaults to "*.canonical.pdf".
+        max_concurrency (int, optional): Maximum number of documents processed
+            concurrently. Defaults to 8.
     """
-    # Iterate over all Document files in the directory
-    for filename in Path(input_directory).rglob(file_glob):
-        if filename.is_file():
-            ext = file_glob.replace("*", "")
-            fname = filename.name.replace(ext, "")
-            print(f"⚙️ Processing {fname}")
 
-            # Run the RAG dataflow
-            meta_filters = {"name": fname}
-            res = playbook_qa(
+    from flows.common.clients.chroma import ChromaClient
+
+    suffix = os.path.basename(file_glob).lstrip("*")
+    output_directory.mkdir(parents=True, exist_ok=True)
+
+    # A single ChromaDB connection shared by all the documents
+    chroma_client = ChromaClient(chroma_host, chroma_port)
+
+    async def process_file(
+        filename: str, semaphore: asyncio.Semaphore, write_pool: ThreadPoolExecutor
+    ) -> Future:
+        fname = os.path.basename(filename).removesuffix(suffix)
+
+        # Run the RAG dataflow (I/O bound) in a worker thread
+        meta_filters = {"name": fname}
+        async with semaphore:
+            print(f"⚙️ Processing {fname}")
+            res = await asyncio.to_thread(
+                playbook_qa,
                 playbook_json=playbook_json,
                 meta_filters=meta_filters,
                 chroma_collection_name=chroma_collection_name,
@@ -107,21 +159,129 @@ def run_playbook_qa_from_directory(
                 reranker_model=reranker_model,
                 similarity_top_k=similarity_top_k,
                 similarity_cutoff=similarity_cutoff,
+                # Progress bars can't be displayed concurrently
+                pbar=max_concurrency == 1,
+                chroma_client=chroma_client,
             )
-            # Write the results to a file; concatenate the filters to the file name
-            filters = "_".join(f"{k}={v}" for k, v in meta_filters.items())
-            result_filename = f"{filters}_qa_results.json"
 
-            output_directory = Path(output_directory)
-            if not output_directory.exists():
-                output_directory.mkdir(parents=True)
+        # Offload the write so the next document can start right away
+        return write_pool.submit(
+            write_json, output_directory / _result_filename(meta_filters), res, True
+        )
+
+    # Iterate over all Document files in the directory
+    filenames = list(iter_files(input_directory, file_glob))
+
+    async def main(write_pool: ThreadPoolExecutor) -> list[Future | BaseException]:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        tasks = [
+            process_file(filename, semaphore, write_pool) for filename in filenames
+        ]
+        # A failing document must not cancel (and discard) all the others
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    with ThreadPoolExecutor(max_workers=4) as write_pool:
+        for filename, write in zip(filenames, asyncio.run(main(write_pool))):
+            if isinstance(write, BaseException):
+                print(f"❌ Error processing {filename}: {write}")
+                continue
+            write.result()  # Wait for every write and surface its errors
+
+
+@cli.command()
+@click.argument(
+    "input-directory", type=click.Path(exists=True, file_okay=False, path_type=Path)
+)
+@click.argument("output-directory", type=click.Path(file_okay=False, path_type=Path))
+@click.argument(
+    "playbook_json", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@common_rag_options
+@click.option("-fg", "--file-glob", default="*.canonical.pdf", help="File glob pattern")
+@click.option(
+    "-b",
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=QA_BATCH_SIZE_DEFAULT,
+    help="Number of documents retrieved together per ChromaDB query",
+)
+def run_playbook_qa_batch(
+    input_directory: Path,
+    output_directory: Path,
+    playbook_json: Path,
+    chroma_collection_name: str,
+    chroma_host: str,
+    chroma_port: int,
+    llm_backend: str,
+    llm_model: str,
+    embedding_model: str,
+    reranker_model: str | None,
+    similarity_top_k: int,
+    similarity_cutoff: float,
+    file_glob: str,
+    batch_size: int,
+):
+    """Batched version of 'run-playbook-qa-from-directory'. Document names are
+    grouped in batches and each question is retrieved once per batch instead of
+    once per document.
+
+    Args:
+        input_directory (Path): Path to the directory containing the document files.
+        output_directory (Path): Path to the directory where results are written.
+        playbook_json (Path): Path to the playbook JSON file.
+        chroma_collection_name (str): Name of the collection to use.
+        chroma_host (str, optional): ChromaDB host. Defaults to "localhost".
+        chroma_port (int, optional): ChromaDB port. Defaults to 8000.
+        llm_backend (str, optional): LLM backend to use. Defaults to "openai".
+        llm_model (str, optional): LLM model to use. Defaults to "gpt-4o".
+        embedding_model (str, optional): Embedding model to use. Defaults to "text-embedding-3-small".
+        reranker_model (str | None, optional): Reranker model to use. Defaults to None.
+        similarity_top_k (int, optional): Number of top results to retrieve. Defaults to 5.
+        similarity_cutoff (float, optional): Similarity cutoff for retrieval. Defaults to 0.3.
+        file_glob (str, optional): File glob pattern. Defaults to "*.canonical.pdf".
+        batch_size (int, optional): Number of documents per batch. Defaults to 50.
+    """
+    from flows.common.clients.chroma import ChromaClient
+
+    suffix = os.path.basename(file_glob).lstrip("*")
+    fnames = [
+        os.path.basename(filename).removesuffix(suffix)
+        for filename in iter_files(input_directory, file_glob)
+    ]
+
+    output_directory.mkdir(parents=True, exist_ok=True)
+
+    # A single ChromaDB connection shared by all the batches
+    chroma_client = ChromaClient(chroma_host, chroma_port)
 
-            with (output_directory / result_filename).open("w") as f:
-                f.write(json.dumps(res, indent=2))
+    for i in range(0, len(fnames), batch_size):
+        batch = fnames[i : i + batch_size]
+        print(f"⚙️ Processing batch of {len(batch)} documents")
+
+        # Run the batched RAG dataflow
+        results = playbook_qa_batched(
+            playbook_json=playbook_json,
+            names=batch,
+            chroma_collection_name=chroma_collection_name,
+            chroma_host=chroma_host,
+            chroma_port=chroma_port,
+            llm_backend=llm_backend,
+            llm_model=llm_model,
+            embedding_model=embedding_model,
+            reranker_model=reranker_model,
+            similarity_top_k=similarity_top_k,
+            similarity_cutoff=similarity_cutoff,
+            chroma_client=chroma_client,
+        )
+        # Write the results to one file per document
+        for fname, res in results.items():
+            write_json(output_directory / _result_filename({"name": fname}), res)
 
 
 @cli.command()
-@click.argument("playbook_json")
+@click.argument(
+    "playbook_json", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
 @common_rag_options
 @click.option(
     "-m",
@@ -131,8 +291,8 @@ def run_playbook_qa_from_directory(
     help="Additional key:value pairs to be parsed as metadata filters",
 )
 def run_playbook_qa(
-    playbook_json: str,
-    meta_filters: str,
+    playbook_json: Path,
+    meta_filters: tuple[str, ...],
     chroma_collection_name: str,
     chroma_host: str,
     chroma_port: int,
@@ -147,7 +307,7 @@ def run_playbook_qa(
     and writes the results to a JSON file.
 
     Args:
-        playbook_json (str): Path to the playbook JSON file.
+        playbook_json (Path): Path to the playbook JSON file.
         chroma_collection_name (str): Name of the collection to use.
         chroma_host (str, optional): ChromaDB host. Defaults to "localhost".
         chroma_port (int, optional): ChromaDB port. Defaults to 8000.
@@ -160,9 +320,7 @@ def run_playbook_qa(
         meta_filters (str): Metadata filters to apply to the questions.
     """
     # Parse additional_params into a dictionary
-    meta_filters = (
-        dict(param.split(":") for param in meta_filters) if meta_filters else {}
-    )
+    meta_filters = _parse_meta_filters(meta_filters)
     # Run the RAG dataflow
     res = playbook_qa(
         playbook_json=playbook_json,
@@ -177,10 +335,7 @@ def run_playbook_qa(
         similarity_top_k=similarity_top_k,
         similarity_cutoff=similarity_cutoff,
     )
-    # Write the results to a file; concatenate the filters to the file name
-    filters = "_".join(f"{k}={v}" for k, v in meta_filters.items())
-    with open(f"{filters}_qa_results.json", "w") as f:
-        f.write(json.dumps(res, indent=2))
+    write_json(Path(_result_filename(meta_filters)), res)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 # Retrieval configuration
 SIMILARITY_TOP_K_DEFAULT = 5
 SIMILARITY_CUTOFF_DEFAULT = 0.3
+# Number of documents retrieved together by the batched QA flow
+QA_BATCH_SIZE_DEFAULT = 50
 
 # ChromaDB configuration
 CHROMA_HOST_ENV_VAR = "CHROMA_HOST"
@@ -1,4 +1,7 @@
+import fnmatch
 import os
+import re
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
@@ -17,6 +20,35 @@ def get_or_raise(env_var: str) -> str:
     )
 
 
+def iter_files(directory: Path | str, file_glob: str) -> Iterator[str]:
+    """Recursively yields the paths of the files under 'directory' whose name
+    matches 'file_glob', walking with os.scandir (which reuses the cached DirEntry
+    file types instead of building and stat-ing a Path object per entry).
+
+    Globs matching on whole paths (i.e.: containing a separator or '**') can't be
+    matched against file names, so those are delegated to 'Path.rglob' instead.
+    """
+    if "**" in file_glob or "/" in file_glob or os.sep in file_glob:
+        for path in Path(directory).rglob(file_glob):
+            if path.is_file():
+                yield str(path)
+        return
+
+    match = re.compile(fnmatch.translate(file_glob)).match
+    pending = [os.fspath(directory)]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except PermissionError:
+            continue  # Unreadable directories are skipped, as 'rglob' does
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif match(entry.name) and entry.is_file():
+                    yield entry.path
+
+
 def get_project_version():
     # Determine the source location of the package
     source_location = Path(__file__).parent
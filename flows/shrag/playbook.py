@@ -1,5 +1,6 @@
 import json
 from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
 
 from loguru import logger
@@ -17,9 +18,24 @@ class QuestionItem(BaseModel):
     answer_schema: type[BaseModel]
 
 
+@lru_cache(maxsize=8)
+def _load_playbook(playbook_path: Path, mtime_ns: int) -> dict:
+    """Reads and parses a playbook JSON file. Cached on (path, modification time)
+    so runs sharing the same playbook only read and parse it once, while edits
+    to the file are still picked up"""
+    return json.loads(playbook_path.read_bytes())
+
+
+def load_playbook(playbook_json: Path | str) -> dict:
+    """Returns the parsed playbook JSON, reusing previously parsed contents if the
+    file did not change"""
+    playbook_path = Path(playbook_json).resolve()
+    return _load_playbook(playbook_path, playbook_path.stat().st_mtime_ns)
+
+
 @task
 def build_question_library(
-    playbook_json: Path | str,
+    playbook_json: Path | str | dict,
 ) -> dict[str, list[QuestionItem]]:
     """Builds the Question Library from the playbook JSON file.
 
@@ -34,7 +50,8 @@ def build_question_library(
     }
 
     Args:
-        playbook_json (Path | str): _path_ to the proto questions JSON
+        playbook_json (Path | str | dict): _path_ to the proto questions JSON or
+            its already parsed contents
     Returns:
         dict[str, list[QuestionItem]]: Question Library
         - The keys are the group names
@@ -44,7 +61,10 @@ def build_question_library(
     """
 
     # Read Question Library JSON (aka: The Playbook)
-    playbook = json.load(Path(playbook_json).open())
+    if isinstance(playbook_json, dict):
+        playbook = playbook_json
+    else:
+        playbook = load_playbook(playbook_json)
 
     # Add the Answer Schema based on the extracted values
     q_collection = defaultdict(list)
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from typing import Any
 
 from llama_index.core import get_response_synthesizer, VectorStoreIndex
@@ -33,6 +34,30 @@ def generate_ask_run_name():
     return task_name
 
 
+def build_metadata_filters(
+    meta_filters: dict[str, Any], batch_key: str | None = None, batch_values=None
+) -> MetadataFilters:
+    """Builds the retriever's metadata filters from {key:value} equality pairs and,
+    optionally, a '$in' filter matching any of 'batch_values' on 'batch_key'"""
+    filters = [
+        MetadataFilter(
+            key=k,
+            operator=FilterOperator.EQ,
+            value=v,
+        )
+        for k, v in meta_filters.items()
+    ]
+    if batch_key is not None:
+        filters.append(
+            MetadataFilter(
+                key=batch_key,
+                operator=FilterOperator.IN,
+                value=list(batch_values),
+            )
+        )
+    return MetadataFilters(filters=filters)
+
+
 class QAResponse(BaseModel):
     question: str
     question_type: str
@@ -74,16 +99,7 @@ class QAgent:
             BaseAnswer: Retrieval Augmented Generated Answer
         """
         # Build the Retriever with its metadata filters
-        filters = MetadataFilters(
-            filters=[
-                MetadataFilter(
-                    key=k,
-                    operator=FilterOperator.EQ,
-                    value=v,
-                )
-                for k, v in meta_filters.items()
-            ]
-        )
+        filters = build_metadata_filters(meta_filters)
         retriever = self.index.as_retriever(
             filters=filters,
             similarity_cutoff=similarity_cutoff,
@@ -108,6 +124,84 @@ class QAgent:
 
         return response.response
 
+    def rag_batch(
+        self,
+        query: str,
+        batch_key: str,
+        batch_values: list[str],
+        meta_filters: dict[str, Any] = {},
+        output_cls: BaseModel = SummaryAnswer,
+        similarity_top_k: int = SIMILARITY_TOP_K_DEFAULT,
+        similarity_cutoff: float = SIMILARITY_CUTOFF_DEFAULT,
+    ) -> dict[str, BaseAnswer]:
+        """Batched version of 'rag'. Issues a single retrieval for all the
+        'batch_values' (i.e.: metadata filter '{batch_key: {$in: batch_values}}')
+        and then dispatches the retrieved nodes to a per-value re-ranking and
+        generation step. Values that got fewer than 'similarity_top_k' nodes from the
+        shared retrieval (crowded out by higher scoring ones) fall back to 'rag'
+        with their own equality filter.
+
+        Args:
+            query (str): Question to ask the RAG system
+            batch_key (str): Metadata key to batch on (e.g.: 'name')
+            batch_values (list[str]): Metadata values to batch (e.g.: document names)
+            meta_filters (dict[str, Any], optional): Additional metadata filters for
+                retrieval. Defaults to {}.
+            output_cls (BaseModel, optional): Output Schema. Defaults to SummaryAnswer.
+            similarity_top_k (int, optional): Number of top results to retrieve per
+                batch value. Defaults to SIMILARITY_TOP_K_DEFAULT.
+            similarity_cutoff (float, optional): Similarity cutoff for retrieval.
+                Defaults to SIMILARITY_CUTOFF_DEFAULT.
+        Returns:
+            dict[str, BaseAnswer | Exception]: Mapping from batch value to its
+                generated Answer, or to the exception raised while generating it.
+        """
+        # Retrieve once for the whole batch
+        filters = build_metadata_filters(meta_filters, batch_key, batch_values)
+        retriever = self.index.as_retriever(
+            filters=filters,
+            similarity_cutoff=similarity_cutoff,
+            similarity_top_k=similarity_top_k * len(batch_values),
+        )
+        nodes_by_value = defaultdict(list)
+        for node in retriever.retrieve(query):
+            value = node.node.metadata.get(batch_key)
+            if len(nodes_by_value[value]) < similarity_top_k:
+                nodes_by_value[value].append(node)
+
+        # Structure the LLM as per the passed output class
+        sllm = self.llm.as_structured_llm(output_cls=output_cls)
+        response_synthesizer = get_response_synthesizer(
+            structured_answer_filtering=False, response_mode="tree_summarize", llm=sllm
+        )
+
+        # Re-rank and generate the structured response for each batch value
+        answers = {}
+        for value in batch_values:
+            nodes = nodes_by_value.get(value, [])
+            try:
+                if len(nodes) < similarity_top_k:
+                    logger.warning(
+                        f"⚠️ Batched retrieval got {len(nodes)}/{similarity_top_k} "
+                        f"nodes for {batch_key}={value}. Retrieving it on its own"
+                    )
+                    answers[value] = self.rag(
+                        query=query,
+                        meta_filters={**meta_filters, batch_key: value},
+                        output_cls=output_cls,
+                        similarity_top_k=similarity_top_k,
+                        similarity_cutoff=similarity_cutoff,
+                    )
+                    continue
+                if self.reranker:
+                    nodes = self.reranker.postprocess_nodes(nodes, query_str=query)
+                answers[value] = response_synthesizer.synthesize(query, nodes).response
+            except Exception as e:
+                # Isolate the failure to this value, as a per-value 'rag' would
+                answers[value] = e
+
+        return answers
+
     @task(task_run_name=generate_ask_run_name)
     def ask(
         self,
@@ -187,6 +281,131 @@ class QAgent:
 
         return responses
 
+    @task(task_run_name=generate_ask_run_name)
+    def ask_batch(
+        self,
+        q: QuestionItem,
+        batch_key: str,
+        batch_values: list[str],
+        meta_filters: dict[str, Any] = {},
+        **kwargs,
+    ) -> dict[str, BaseAnswer]:
+        """Batched version of 'ask'. Accepts all the keyword arguments of 'rag_batch'
+
+        Args:
+            q (QuestionItem): The Question Collection Item to query
+            batch_key (str): Metadata key to batch on (e.g.: 'name')
+            batch_values (list[str]): Metadata values to batch (e.g.: document names)
+            meta_filters (dict[str, Any]): Additional metadata retrieval filters
+        Returns:
+            dict[str, BaseAnswer]: Mapping from batch value to its Answer
+        """
+
+        def error_answer(e: Exception) -> BaseAnswer:
+            return BaseAnswer(
+                response=f"Error answering q={q.key}",
+                page_numbers=[],
+                confidence=0.0,
+                confidence_explanation=str(e),
+            )
+
+        prompt = get_question_prompt(q)
+        try:
+            answers = self.rag_batch(
+                query=prompt,
+                batch_key=batch_key,
+                batch_values=batch_values,
+                output_cls=q.answer_schema,
+                meta_filters=meta_filters,
+                **kwargs,
+            )
+        except Exception as e:
+            # The shared retrieval failed for the whole batch
+            print(f"❌ Error extracting '{q.key}' [batch={batch_values}]: {e}")
+            return {value: error_answer(e) for value in batch_values}
+
+        for value, answer in answers.items():
+            if isinstance(answer, Exception):
+                print(f"❌ Error extracting '{q.key}' [{batch_key}={value}]: {answer}")
+                answers[value] = error_answer(answer)
+
+        return answers
+
+    @task(task_run_name="Q-Collection:{batch_key}-batch")
+    def run_q_collection_batch(
+        self,
+        q_collection: dict[str, list[QuestionItem]],
+        batch_key: str,
+        batch_values: list[str],
+        meta_filters: dict[str, Any] = {},
+        pbar: bool = False,
+        **kwargs,
+    ) -> dict[str, dict[str, QAResponse]]:
+        """Batched version of 'run_q_collection'. Every question is retrieved once
+        for all the 'batch_values'. For hierarchical groups, the follow-up questions
+        are only asked for those values whose first (YES/NO) answer is affirmative.
+
+        Args:
+            q_collection (dict[str, list[QuestionItem]]): The Question Collection
+            batch_key (str): Metadata key to batch on (e.g.: 'name')
+            batch_values (list[str]): Metadata values to batch (e.g.: document names)
+            meta_filters (dict[str, Any], optional): Additional metadata filters.
+                Defaults to {}.
+            pbar (bool, optional): Whether to show a progress bar. Defaults to False.
+        Returns:
+            dict[str, dict[str, QAResponse]]: Mapping from batch value to its responses
+                (as returned by 'run_q_collection')
+        """
+        questions_iter = tqdm(q_collection.items()) if pbar else q_collection.items()
+        responses = {value: {} for value in batch_values}
+
+        def collect(q: QuestionItem, answers: dict[str, BaseAnswer]):
+            for value, answer in answers.items():
+                responses[value][q.key] = QAResponse(
+                    question=q.question,
+                    question_type=q.question_type,
+                    answer=answer,
+                )
+
+        for _, q_list in questions_iter:
+            q = q_list[0]  # Get the first question of the group
+            if pbar:
+                questions_iter.set_description(q.key)
+
+            if len(q_list) > 1 and q.question_type != QuestionType.YES_NO:
+                logger.error(
+                    f"❌ Error asking group '{q.key}': The first question of the "
+                    f"group should be of type YES/NO. Instead received {q.question_type}"
+                )
+                continue
+
+            answers = self.ask_batch(q, batch_key, batch_values, meta_filters, **kwargs)
+            collect(q, answers)
+
+            if len(q_list) > 1:
+                # A hierarchical group: only follow-up on the affirmative values
+                affirmative = []
+                for value, res in answers.items():
+                    if not isinstance(res.response, YesNoEnum):
+                        logger.error(
+                            f"❌ Error asking group '{q.key}' [{batch_key}={value}]: "
+                            "The response of the first question should be of type "
+                            f"YesNoEnum. Instead received {type(res.response)}"
+                        )
+                    elif res.response.value == YesNoEnum.pos.value:
+                        affirmative.append(value)
+                if not affirmative:
+                    continue
+                for q_sub in q_list[1:]:
+                    collect(
+                        q_sub,
+                        self.ask_batch(
+                            q_sub, batch_key, affirmative, meta_filters, **kwargs
+                        ),
+                    )
+
+        return responses
+
     @task(task_run_name="Q-Collection:{meta_filters}")
     def run_q_collection(
         self,